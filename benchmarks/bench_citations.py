@@ -0,0 +1,22 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("numpy")
+pytest.importorskip("rapidfuzz")
+pytest.importorskip("bibtexparser")
+
+from benchmarks.synthetic import SCALES, generate_bibliography
+from cglp.data.dedup import simplify
+from preprocess_dataset import _get_cites
+
+
+@pytest.mark.parametrize("num_papers", SCALES)
+def bench_get_cites(benchmark, corpus, num_papers):
+    """Matching one bibliography against every title in the corpus."""
+    papers = corpus(num_papers)
+    citing_id = max(papers, key=lambda id: len(papers[id].references))
+    bib = generate_bibliography(papers, citing_id)
+    simple_titles = [(id, simplify(paper.title)) for id, paper in papers.items()]
+    cites, comparisons = benchmark(_get_cites, (citing_id, bib, simple_titles))
+    assert cites
+    assert comparisons <= num_papers
@@ -0,0 +1,21 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("numpy")
+
+from benchmarks.synthetic import SCALES
+from cglp.data import load_dataset, save_dataset
+
+
+@pytest.mark.parametrize("num_papers", SCALES)
+def bench_save_dataset(benchmark, corpus, tmp_path, num_papers):
+    papers = corpus(num_papers)
+    benchmark(save_dataset, papers, tmp_path / "dataset")
+
+
+@pytest.mark.parametrize("num_papers", SCALES)
+def bench_load_dataset(benchmark, corpus, tmp_path, num_papers):
+    papers = corpus(num_papers)
+    save_dataset(papers, tmp_path / "dataset")
+    loaded = benchmark(load_dataset, tmp_path / "dataset")
+    assert loaded == papers
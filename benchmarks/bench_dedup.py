@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("numpy")
+
+from benchmarks.synthetic import SCALES
+from cglp.data.dedup import compute_signatures, find_duplicates, simplify
+
+
+NUM_DUPLICATES: int = 50
+
+
+def texts_with_duplicates(papers) -> dict[str, str]:
+    """The simplified texts of the corpus and a few near-duplicates (one word changed)."""
+    texts = {id: simplify(paper.title) + " " + simplify(paper.abstract)
+             for id, paper in papers.items()}
+    for id in list(texts)[:NUM_DUPLICATES]:
+        words = texts[id].split()
+        words[len(words) // 2] = "duplicate"
+        texts[f"dup-{id}"] = " ".join(words)
+    return texts
+
+
+@pytest.mark.parametrize("num_papers", SCALES)
+def bench_compute_signatures(benchmark, corpus, num_papers):
+    texts = texts_with_duplicates(corpus(num_papers))
+    signatures = benchmark.pedantic(compute_signatures, args=(texts,), rounds=3)
+    assert len(signatures) == len(texts)
+
+
+@pytest.mark.parametrize("num_papers", SCALES)
+def bench_find_duplicates(benchmark, corpus, num_papers):
+    """LSH over the signatures; only papers sharing a bucket are compared."""
+    signatures = compute_signatures(texts_with_duplicates(corpus(num_papers)))
+    clusters = benchmark.pedantic(find_duplicates, args=(signatures,), rounds=3)
+    assert len(clusters) == NUM_DUPLICATES
@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("numpy")
+pytest.importorskip("networkx")
+pytest.importorskip("matplotlib")
+
+from analyze_graph import create_graph, get_stats
+from benchmarks.synthetic import SCALES
+from cglp.data import index_references
+
+
+@pytest.mark.parametrize("num_papers", SCALES)
+def bench_index_references(benchmark, corpus, num_papers):
+    citations = benchmark(index_references, corpus(num_papers))
+    assert citations.unresolved == 0
+
+
+@pytest.mark.parametrize("num_papers", SCALES)
+def bench_create_graph(benchmark, corpus, num_papers):
+    citations = index_references(corpus(num_papers))
+    graph = benchmark(create_graph, citations)
+    assert graph.number_of_nodes() == num_papers
+
+
+DIAMETER_SOURCES: int = 32
+"""BFS sources for the diameter; the exact diameter takes minutes at 5k papers."""
+
+
+@pytest.mark.parametrize("num_papers", SCALES)
+def bench_get_stats(benchmark, corpus, num_papers):
+    graph = create_graph(index_references(corpus(num_papers)))
+    benchmark.pedantic(get_stats, args=(graph, DIAMETER_SOURCES), rounds=3)
+
+
+def bench_get_stats_exact(benchmark, corpus):
+    graph = create_graph(index_references(corpus(SCALES[0])))
+    benchmark.pedantic(get_stats, args=(graph,), rounds=3)
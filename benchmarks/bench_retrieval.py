@@ -0,0 +1,69 @@
+import sys
+import types
+import zlib
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("yaml")
+
+import torch
+
+from benchmarks.synthetic import SCALES, generate_embeddings
+from cglp.data import save_dataset
+from cglp.metrics import Metrics
+from evaluation import rank, rank_by_similarity
+
+
+DIM: int = 768
+
+
+class StubTokenizer:
+    """Stands in for the SPECTER2 tokenizer (hashes words into the vocabulary)."""
+    sep_token = "[SEP]"
+
+    def __call__(self, texts, **kwargs):
+        ids = [[zlib.crc32(word.encode()) % 30_000 for word in text.split()][:512]
+               for text in texts]
+        return {"input_ids": torch.tensor(ids)}
+
+
+class StubModel:
+    """Stands in for SPECTER2 with a random projection of the token IDs."""
+
+    def __init__(self):
+        self.projection = torch.randn(30_000, DIM, generator=torch.Generator().manual_seed(0))
+
+    def __call__(self, input_ids):
+        return types.SimpleNamespace(last_hidden_state=self.projection[input_ids])
+
+
+@pytest.mark.parametrize("num_papers", SCALES)
+def bench_rank_by_similarity(benchmark, num_papers):
+    embeddings = torch.from_numpy(generate_embeddings(num_papers, DIM))
+    query = torch.from_numpy(generate_embeddings(1, DIM, seed=1))
+    ranking = benchmark(rank_by_similarity, embeddings, query)
+    assert sorted(ranking) == list(range(num_papers))
+
+
+@pytest.mark.parametrize("num_papers", SCALES)
+def bench_rank(benchmark, monkeypatch, corpus, tmp_path, num_papers):
+    """End-to-end ranking (without cache) of a query with a stubbed encoder."""
+    papers = corpus(num_papers)
+    save_dataset(papers, tmp_path / "dataset")
+    torch.save(torch.from_numpy(generate_embeddings(num_papers, DIM)), tmp_path / "embeddings")
+    model = types.ModuleType("cglp.model")
+    model.load_specter2 = lambda snapshot, device: (StubTokenizer(), StubModel())  # type: ignore
+    monkeypatch.setitem(sys.modules, "cglp.model", model)
+
+    config = {
+        "dataset": str(tmp_path / "dataset"),
+        "embeddings": str(tmp_path / "embeddings"),
+        "model": str(tmp_path / "model"),
+        "device": "cpu",
+    }
+    query = next(iter(papers.values()))
+    result = benchmark(rank, config, query.title, query.abstract, Metrics())
+    assert sorted(result) == sorted(papers)
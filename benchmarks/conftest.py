@@ -0,0 +1,25 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# the scripts are not a package; make `import analyze_graph` etc. work
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
+
+
+@pytest.fixture(scope="session")
+def corpus():
+    """Synthetic corpora, generated once per scale and shared by all benchmarks.
+
+    Benchmarks must not modify the returned papers.
+    """
+    from benchmarks.synthetic import CorpusSpec, generate_papers
+
+    cache = {}
+
+    def get(num_papers: int):
+        if num_papers not in cache:
+            cache[num_papers] = generate_papers(CorpusSpec(num_papers))
+        return cache[num_papers]
+
+    return get
@@ -0,0 +1,101 @@
+"""Synthetic corpora for benchmarks.
+
+The real dataset has to be downloaded, so benchmarks run on generated papers
+whose shape (number of papers, references per paper, title and abstract
+lengths) is configurable. Everything is seeded and hence reproducible.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from cglp.data import Paper, arXivId
+
+
+SCALES: list[int] = [1_000, 5_000, 20_000]
+"""Corpus sizes the benchmarks are run at (the real dataset has ~6.5k papers)."""
+
+@dataclass(frozen=True)
+class CorpusSpec:
+    """Shape of a synthetic corpus."""
+    num_papers: int
+    """Number of papers in the corpus."""
+    mean_references: float = 15.0
+    """Mean number of references per paper (Poisson distributed)."""
+    citation_skew: float = 1.1
+    """Zipf exponent of the popularity of cited papers (0 for uniform)."""
+    title_words: tuple[int, int] = (5, 15)
+    """Inclusive range of the number of words in a title."""
+    abstract_words: tuple[int, int] = (100, 250)
+    """Inclusive range of the number of words in an abstract."""
+    vocab_size: int = 20_000
+    """Number of distinct words."""
+    seed: int = 0
+
+
+def _vocabulary(rng: np.random.Generator, size: int) -> np.ndarray:
+    lengths = rng.integers(2, 12, size=size)
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    return np.array(["".join(rng.choice(letters, n)) for n in lengths])
+
+
+def _text(rng: np.random.Generator, vocab: np.ndarray, words: tuple[int, int]) -> str:
+    return " ".join(rng.choice(vocab, rng.integers(words[0], words[1] + 1)))
+
+
+def arxiv_ids(rng: np.random.Generator, n: int) -> list[arXivId]:
+    """`n` distinct, sorted arXiv-style IDs (`YYMM.NNNNN`) from 2015 to 2024."""
+    ids: set[arXivId] = set()
+    while len(ids) < n:
+        year = rng.integers(15, 25)
+        month = rng.integers(1, 13)
+        number = rng.integers(0, 100_000)
+        ids.add(f"{year:02d}{month:02d}.{number:05d}")
+    return sorted(ids)
+
+
+def generate_papers(spec: CorpusSpec) -> dict[arXivId, Paper]:
+    """Generate papers whose references point to other papers in the corpus."""
+    rng = np.random.default_rng(spec.seed)
+    vocab = _vocabulary(rng, spec.vocab_size)
+    ids = arxiv_ids(rng, spec.num_papers)
+
+    popularity = 1.0 / np.arange(1, spec.num_papers + 1) ** spec.citation_skew
+    cdf = np.cumsum(rng.permutation(popularity))
+    cdf /= cdf[-1]
+    num_refs = np.minimum(rng.poisson(spec.mean_references, spec.num_papers),
+                          spec.num_papers - 1)
+
+    papers: dict[arXivId, Paper] = {}
+    for i, arxiv_id in enumerate(ids):
+        refs: set[arXivId] = set()
+        while len(refs) < num_refs[i]:
+            for j in np.searchsorted(cdf, rng.random(2 * (num_refs[i] - len(refs)))):
+                if j != i and len(refs) < num_refs[i]:
+                    refs.add(ids[j])
+        papers[arxiv_id] = Paper(
+            _text(rng, vocab, spec.title_words),
+            _text(rng, vocab, spec.abstract_words),
+            refs
+        )
+    return papers
+
+
+def generate_bibliography(papers: dict[arXivId, Paper], arxiv_id: arXivId, seed: int = 0) -> str:
+    """A simplified bibliography (as in `super_simple_refs.txt`) of `arxiv_id`.
+
+    Each reference is its title surrounded by made-up authors and venues, and
+    everything is lowercased and stripped of punctuation like the real ones.
+    """
+    rng = np.random.default_rng(seed)
+    vocab = _vocabulary(rng, 2_000)
+    entries: list[str] = []
+    for ref_id in sorted(papers[arxiv_id].references):
+        authors = _text(rng, vocab, (2, 8))
+        venue = _text(rng, vocab, (3, 6))
+        entries.append(f"{authors}\n{papers[ref_id].title.lower()}\n{venue} 20{ref_id[:2]}\n")
+    return "\n".join(entries)
+
+
+def generate_embeddings(num_papers: int, dim: int = 768, seed: int = 0) -> np.ndarray:
+    """Random float32 embeddings, one row per paper."""
+    return np.random.default_rng(seed).standard_normal((num_papers, dim), dtype=np.float32)
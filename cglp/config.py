@@ -0,0 +1,14 @@
+from pathlib import Path
+from typing import Any
+
+
+CONFIG: Path = Path("config/evaluation.yaml")
+"""The evaluation config, which also holds the defaults shared with the scripts."""
+
+
+def load_config(path: Path = CONFIG) -> dict[str, Any]:
+    """Read the config with pyyaml (imported here, so that importing this module stays cheap)."""
+    import yaml
+
+    with open(path) as f:
+        return yaml.safe_load(f)
@@ -1,4 +1,6 @@
 from .paper import paperId, arXivId, Paper, Paper
-from .utils import load_dataset, save_dataset
+from .utils import append_dataset, load_dataset, save_dataset, sidecar_path
+from .ids import IdIndex, CitationGraph, index_references, load_citation_graph
 
-__all__ = ['Paper', 'paperId', 'arXivId', 'load_dataset', 'save_dataset']
+__all__ = ['Paper', 'paperId', 'arXivId', 'load_dataset', 'save_dataset', 'append_dataset',
+           'sidecar_path', 'IdIndex', 'CitationGraph', 'index_references', 'load_citation_graph']
@@ -0,0 +1,131 @@
+import re
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+
+NUM_PERM: int = 128
+"""Number of hash functions in a MinHash signature."""
+BANDS: int = 16
+"""Number of LSH bands; each band hashes `NUM_PERM // BANDS` rows of the signature."""
+THRESHOLD: float = 0.8
+"""Minimum estimated Jaccard similarity of the shingles of near-duplicates."""
+SHINGLE_SIZE: int = 3
+"""Number of words in a shingle."""
+
+_PRIME: int = (1 << 31) - 1
+"""Modulus of the hash functions. Small enough for `a * x + b` to fit in 64 bits."""
+
+
+def simplify(text: str) -> str:
+    """Lowercase the text and drop everything except letters, digits and spaces."""
+    return re.sub(r"[^ a-z0-9]", "", text.lower())
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of the distinct `size`-word shingles of a simplified text.
+
+    Texts with fewer than `size` words have no shingles.
+    """
+    words = text.split()
+    grams = {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+    return np.fromiter((zlib.crc32(g.encode()) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+class MinHasher:
+    """MinHash signatures with hash functions `(a * x + b) % _PRIME`."""
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.a: np.ndarray = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self.b: np.ndarray = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+
+    def __call__(self, text: str) -> np.ndarray:
+        """The signature of a simplified text with at least one shingle."""
+        x = shingles(text)
+        return ((np.outer(self.a, x) + self.b[:, None]) % _PRIME).min(axis=1)
+
+
+def compute_signatures(texts: dict[str, str], num_perm: int = NUM_PERM) -> dict[str, np.ndarray]:
+    """MinHash signatures of simplified texts.
+
+    Texts with fewer than `SHINGLE_SIZE` words are skipped: they have no
+    shingles, so they are not near-duplicates of anything.
+    """
+    minhash = MinHasher(num_perm)
+    return {key: minhash(text) for key, text in texts.items()
+            if len(text.split()) >= SHINGLE_SIZE}
+
+
+def save_signatures(signatures: dict[str, np.ndarray], path: Union[str, Path]):
+    """Save signatures as an `.npz` file with the keys and the signature matrix."""
+    keys = sorted(signatures)
+    matrix = np.zeros((len(keys), NUM_PERM), dtype=np.uint64)
+    for i, key in enumerate(keys):
+        matrix[i] = signatures[key]
+    np.savez(path, keys=np.array(keys, dtype=str), signatures=matrix)
+
+
+def load_signatures(path: Union[str, Path], num_perm: int = NUM_PERM) -> dict[str, np.ndarray]:
+    """Load signatures saved by `save_signatures()`.
+
+    Signatures computed with a different number of hash functions are dropped.
+    """
+    with np.load(path) as data:
+        if data["signatures"].shape[1] != num_perm:
+            return {}
+        return dict(zip(data["keys"].tolist(), data["signatures"]))
+
+
+def find_duplicates(
+    signatures: dict[str, np.ndarray],
+    threshold: float = THRESHOLD,
+    bands: int = BANDS
+) -> list[list[str]]:
+    """Find clusters of near-duplicate texts from their signatures.
+
+    Texts whose signatures agree on all rows of at least one band are
+    candidates, and candidates whose signatures agree on at least `threshold`
+    of the rows (an estimate of the Jaccard similarity of their shingles) are
+    near-duplicates. This only compares texts that share a bucket instead of
+    all pairs. Clusters are the connected components of the near-duplicate
+    relation; only clusters with more than one text are returned.
+
+    The signatures come from `compute_signatures()` on texts simplified with
+    `simplify()`.
+    """
+    keys: list[str] = list(signatures)
+    if not keys:
+        return []
+    matrix = np.stack([signatures[key] for key in keys])
+    rows = matrix.shape[1] // bands
+
+    parent: list[int] = list(range(len(keys)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    compared: set[tuple[int, int]] = set()
+    for band in range(bands):
+        buckets: dict[bytes, list[int]] = defaultdict(list)
+        for i, sig in enumerate(matrix[:, band * rows : (band + 1) * rows]):
+            buckets[sig.tobytes()].append(i)
+        for bucket in buckets.values():
+            for n, i in enumerate(bucket):
+                for j in bucket[n + 1:]:
+                    if (i, j) in compared:
+                        continue
+                    compared.add((i, j))
+                    if np.mean(matrix[i] == matrix[j]) >= threshold:
+                        parent[find(j)] = find(i)
+
+    clusters: dict[int, list[str]] = defaultdict(list)
+    for i, key in enumerate(keys):
+        clusters[find(i)].append(key)
+    return sorted(sorted(c) for c in clusters.values() if len(c) > 1)
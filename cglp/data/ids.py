@@ -0,0 +1,136 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional, Union
+
+from .paper import Paper, arXivId, paperId
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+ID_INDEX_SUFFIX: str = ".ids.json"
+"""Appended to the path of a dataset to get the path of its `IdIndex`."""
+
+
+@dataclass
+class IdIndex:
+    """Bidirectional map between arXiv IDs and Semantic Scholar paperIds."""
+    arxiv_to_paper: dict[arXivId, paperId] = field(default_factory=dict)
+    paper_to_arxiv: dict[paperId, arXivId] = field(default_factory=dict)
+
+    def add(self, arxiv_id: arXivId, paper_id: paperId, ingested: bool = True):
+        """Record that `arxiv_id` and `paper_id` identify the same paper.
+
+        Mappings of the papers in the dataset (`ingested`) take precedence over
+        the ones taken from references: a mapping with `ingested=False` only
+        fills the directions that are not mapped yet.
+        """
+        if ingested:
+            self.arxiv_to_paper[arxiv_id] = paper_id
+            self.paper_to_arxiv[paper_id] = arxiv_id
+        else:
+            self.arxiv_to_paper.setdefault(arxiv_id, paper_id)
+            self.paper_to_arxiv.setdefault(paper_id, arxiv_id)
+
+    def __len__(self) -> int:
+        return len(self.arxiv_to_paper)
+
+    @staticmethod
+    def path_for(dataset: Union[str, Path]) -> Path:
+        """The path of the index that belongs to the dataset at `dataset`."""
+        from .utils import sidecar_path
+
+        return sidecar_path(dataset, ID_INDEX_SUFFIX)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "IdIndex":
+        """Load an index saved by `save()`."""
+        import json
+
+        with open(path) as f:
+            data = json.load(f)
+        return cls(arxiv_to_paper=data["arxiv_to_paper"], paper_to_arxiv=data["paper_to_arxiv"])
+
+    def save(self, path: Union[str, Path]):
+        """Save both directions of the index as a JSON object.
+
+        They are not inverses of each other when references mapped an ID that
+        an ingested paper maps differently.
+        """
+        import json
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({"arxiv_to_paper": self.arxiv_to_paper,
+                       "paper_to_arxiv": self.paper_to_arxiv}, f, indent=4, sort_keys=True)
+
+
+@dataclass
+class CitationGraph:
+    """The citation graph of a dataset with dense integer node IDs."""
+    nodes: list[Union[arXivId, paperId]]
+    """The paper ID of each node. Sorted, so that node `i` is row `i` of the embeddings."""
+    edges: "np.ndarray"
+    """`(num_edges, 2)` array of (citing, cited) node IDs."""
+    unresolved: int
+    """Number of references to papers that are not in the dataset."""
+
+
+def index_references(
+    papers: dict[Union[arXivId, paperId], Paper],
+    ids: Optional[IdIndex] = None
+) -> CitationGraph:
+    """Resolve the references of `papers` to dense integer node IDs.
+
+    References may be arXiv IDs or paperIds regardless of which kind of ID the
+    dataset is keyed by; with `ids`, an ID that is not in the dataset resolves
+    to the node it maps to (in either direction). The references are looked up
+    all at once with a binary search over the sorted IDs, and the edges are
+    returned as an array (without duplicates, e.g., when a paper lists both
+    IDs of a reference). Only flattening the reference sets is done per
+    reference in Python.
+    """
+    from itertools import chain
+
+    import numpy as np
+
+    nodes = sorted(papers)
+    if not nodes:
+        return CitationGraph(nodes=nodes, edges=np.zeros((0, 2), dtype=np.int64), unresolved=0)
+    node_ids = np.array(nodes, dtype=str)
+    keys, values = node_ids, np.arange(len(nodes), dtype=np.int64)
+    if ids is not None:
+        src = np.array([*ids.arxiv_to_paper, *ids.paper_to_arxiv], dtype=str)
+        dst = np.array([*ids.arxiv_to_paper.values(), *ids.paper_to_arxiv.values()], dtype=str)
+        dst_node = np.searchsorted(node_ids, dst).clip(max=len(nodes) - 1)
+        alias = ~np.isin(src, node_ids) & (node_ids[dst_node] == dst)
+        keys = np.concatenate([keys, src[alias]])
+        values = np.concatenate([values, dst_node[alias]])
+        order = np.argsort(keys, kind="stable")
+        keys, values = keys[order], values[order]
+
+    counts = np.fromiter((len(papers[id].references) for id in nodes), dtype=np.int64,
+                         count=len(nodes))
+    citing = np.repeat(np.arange(len(nodes), dtype=np.int64), counts)
+    refs = np.array(list(chain.from_iterable(papers[id].references for id in nodes)), dtype=str)
+    pos = np.searchsorted(keys, refs).clip(max=len(keys) - 1)
+    found = keys[pos] == refs
+    edges = np.stack([citing[found], values[pos[found]]], axis=1)
+    return CitationGraph(
+        nodes=nodes,
+        edges=np.unique(edges, axis=0),
+        unresolved=int(np.count_nonzero(~found))
+    )
+
+
+def load_citation_graph(
+    filename: Union[str, Path]
+) -> tuple[dict[Union[arXivId, paperId], Paper], CitationGraph]:
+    """Load a dataset and its citation graph, using the dataset's `IdIndex` if it has one."""
+    from .utils import load_dataset
+
+    papers = load_dataset(filename)
+    index_path = IdIndex.path_for(filename)
+    ids = IdIndex.load(index_path) if index_path.exists() else None
+    return papers, index_references(papers, ids)
@@ -1,5 +1,3 @@
-import gzip
-import json
 from dataclasses import asdict
 from pathlib import Path
 from typing import Any, Optional, Union
@@ -7,16 +5,51 @@ from typing import Any, Optional, Union
 from .paper import Paper, paperId
 
 
+MANIFEST_SUFFIX: str = ".manifest.json"
+"""Sidecar with the fingerprints of the paper directories, for `--incremental`."""
+ALIASES_SUFFIX: str = ".aliases.json"
+"""Sidecar with the map from removed near-duplicates to the papers kept in their place."""
+SIGNATURES_SUFFIX: str = ".signatures.npz"
+"""Sidecar with the MinHash signatures of the papers, for `--dedup`."""
+
+
+def sidecar_path(dataset: Union[str, Path], suffix: str) -> Path:
+    """The path of the file with `suffix` that belongs to the dataset at `dataset`."""
+    dataset = Path(dataset)
+    return dataset.with_name(dataset.name + suffix)
+
+
 def load_dataset(filename: Union[str, Path]) -> dict[paperId, Paper]:
-    """Load the dataset from a gzipped JSON file."""
+    """Load the dataset from a gzipped JSON file.
+
+    The file may also contain patches appended by `append_dataset()`, which
+    are applied in order.
+    """
+    import gzip
+    import json
+    import re
+
     with gzip.open(filename, 'rt') as f:
-        data: dict[str, Any] = json.load(f)
+        text: str = f.read()
+    decoder = json.JSONDecoder()
+    whitespace = re.compile(r"\s*")
+    data: dict[str, Any] = {}
+    pos: int = whitespace.match(text).end()  # type: ignore
+    while pos < len(text):
+        patch, pos = decoder.raw_decode(text, pos)
+        data.update(patch)
+        pos = whitespace.match(text, pos).end()  # type: ignore
     return {
         pid: Paper.from_dict(pdata)
         for pid, pdata in data.items()
+        if pdata is not None
     }
 
 
+def _to_json(paper: Paper) -> dict[str, Any]:
+    return {k: list(v) if isinstance(v, set) else v for k, v in asdict(paper).items()}
+
+
 def save_dataset(
     papers: dict[paperId, Paper],
     output_path: Path,
@@ -33,14 +66,12 @@ def save_dataset(
     Each line of the above paragraph (except the last line) ends at the 79th
     column without any padding, which is so rare that it is worth pointing out.
     """
+    import gzip
+    import json
+
     output_path.parent.mkdir(parents=True, exist_ok=True)
     with gzip.open(output_path, 'wt') as f:
-        json.dump({
-            pid: {
-                k: list(v) if isinstance(v, set)
-                else v for k, v in asdict(paper).items()
-            } for pid, paper in papers.items()
-        }, f)
+        json.dump({pid: _to_json(paper) for pid, paper in papers.items()}, f)
 
     if json_path is not None:
         if not isinstance(json_path, Path):
@@ -49,3 +80,34 @@ def save_dataset(
         with gzip.open(output_path, 'rt') as gz_file:
             with open(json_path, 'w') as json_file:
                 json_file.write(gz_file.read())
+
+
+def append_dataset(
+    patch: dict[paperId, Optional[Paper]],
+    output_path: Path,
+    json_path: Optional[Union[str, Path]] = None
+):
+    """Append a patch to a dataset saved by `save_dataset()`.
+
+    The patch is written as another gzip member holding a JSON object, so the
+    existing data is not rewritten. Papers in `patch` replace the stored ones,
+    and papers mapped to `None` are removed. `save_dataset()` compacts the
+    patches away.
+
+    Since a patched file is not a single JSON document, the JSON copy (if
+    requested) is written from the patched dataset.
+    """
+    import gzip
+    import json
+
+    with gzip.open(output_path, 'at') as f:
+        json.dump({pid: None if paper is None else _to_json(paper)
+                   for pid, paper in patch.items()}, f)
+
+    if json_path is not None:
+        if not isinstance(json_path, Path):
+            json_path = Path(json_path)
+        json_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(json_path, 'w') as json_file:
+            json.dump({pid: _to_json(paper)
+                       for pid, paper in load_dataset(output_path).items()}, json_file)
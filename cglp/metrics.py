@@ -0,0 +1,156 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterator, Union
+
+
+SAMPLE_INTERVAL: float = 0.05
+"""Seconds between two samples of the RSS during a stage."""
+
+
+def tree_rss() -> int:
+    """Current resident set size of this process and all of its descendants in bytes.
+
+    Pages shared between processes (e.g., by forked workers) are counted once
+    per process, so this is an upper bound on the memory actually in use.
+    Without `/proc` (e.g., on macOS), this is the peak RSS of this process
+    alone.
+    """
+    if not os.path.exists("/proc/self/statm"):
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+    children: dict[int, list[int]] = defaultdict(list)
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # the fields after the command name, which may contain spaces and parentheses
+        children[int(stat[stat.rindex(")") + 2:].split()[1])].append(int(pid))
+
+    total: int = 0
+    pids: list[int] = [os.getpid()]
+    while pids:
+        pid = pids.pop()
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * resource.getpagesize()
+        except OSError:
+            continue
+        pids.extend(children[pid])
+    return total
+
+
+@dataclass
+class Stage:
+    """Timings, memory and counters of one stage of a script."""
+    seconds: float = 0.0
+    """Wall-clock time spent in the stage."""
+    peak_rss: int = 0
+    """Peak total RSS of the process tree during the stage in bytes (see `tree_rss()`).
+
+    Sampled every `SAMPLE_INTERVAL` seconds, so shorter spikes can be missed.
+    """
+    counters: dict[str, int] = field(default_factory=dict)
+    """Work done in the stage, e.g. the number of papers processed."""
+
+    def count(self, name: str, n: int = 1):
+        """Add `n` to the counter `name`."""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def rates(self) -> dict[str, float]:
+        """Counters per second."""
+        if self.seconds <= 0:
+            return {}
+        return {f"{name}/sec": n / self.seconds for name, n in self.counters.items()}
+
+
+class Metrics:
+    """Per-stage timings, peak RSS (of the process and its workers) and throughput counters.
+
+    Usage:
+
+    ```python
+    metrics = Metrics()
+    with metrics.stage("tokenize") as stage:
+        ...
+        stage.count("tokens", n)
+    metrics.write("metrics.json")
+    ```
+
+    Stages are recorded in the order they finish; entering a stage that was
+    already recorded accumulates into it.
+    """
+
+    def __init__(self):
+        self.start: float = time.perf_counter()
+        self.stages: dict[str, Stage] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[Stage]:
+        """Time the block and record it under `name`."""
+        stage = self.stages.pop(name, None) or Stage()
+        stage.peak_rss = max(stage.peak_rss, tree_rss())
+        done = threading.Event()
+
+        def sample():
+            while not done.wait(SAMPLE_INTERVAL):
+                stage.peak_rss = max(stage.peak_rss, tree_rss())
+
+        sampler = threading.Thread(target=sample, daemon=True)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage.seconds += time.perf_counter() - start
+            done.set()
+            sampler.join()
+            stage.peak_rss = max(stage.peak_rss, tree_rss())
+            self.stages[name] = stage
+
+    def peak_rss(self) -> int:
+        """The largest peak RSS of all stages."""
+        return max((stage.peak_rss for stage in self.stages.values()), default=0)
+
+    def to_dict(self) -> dict:
+        """The metrics as a JSON-serializable dict."""
+        return {
+            "total_seconds": time.perf_counter() - self.start,
+            "peak_rss": self.peak_rss(),
+            "stages": {
+                name: {**asdict(stage), "rates": stage.rates()}
+                for name, stage in self.stages.items()
+            },
+        }
+
+    def write(self, path: Union[str, Path]):
+        """Write the metrics to `path` as JSON."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+    def report(self, file=sys.stderr):
+        """Print a human-readable summary (to stderr by default)."""
+        width = max(map(len, [*self.stages, "total"]))
+        for name, stage in self.stages.items():
+            rates = ", ".join(f"{r:.1f} {counter}" for counter, r in stage.rates().items())
+            print(f"{name:<{width}}  {stage.seconds * 1000:10.1f} ms"
+                  f"  {stage.peak_rss / 2**20:8.1f} MiB" + (f"  ({rates})" if rates else ""),
+                  file=file)
+        print(f"{'total':<{width}}  {(time.perf_counter() - self.start) * 1000:10.1f} ms"
+              f"  {self.peak_rss() / 2**20:8.1f} MiB", file=file)
+
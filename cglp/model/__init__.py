@@ -0,0 +1,4 @@
+from .specter2 import export_specter2, load_specter2
+from .tokens import TokenizedCorpus, prefetch_batches
+
+__all__ = ['export_specter2', 'load_specter2', 'TokenizedCorpus', 'prefetch_batches']
@@ -0,0 +1,87 @@
+import hashlib
+import json
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Union
+
+import torch
+from adapters import AutoAdapterModel
+from transformers import AutoTokenizer, PreTrainedModel, PreTrainedTokenizerBase
+
+
+BASE_MODEL: str = "allenai/specter2_base"
+"""The hub name of the SPECTER2 base model."""
+ADAPTER: str = "allenai/specter2"
+"""The hub name of the SPECTER2 proximity adapter."""
+ADAPTER_NAME: str = "specter2"
+"""The name the adapter is loaded (and activated) as."""
+MANIFEST: str = "snapshot.json"
+"""The file with the digest of a snapshot. Written last, so it marks a complete export."""
+
+
+def export_specter2(output: Path):
+    """Save the tokenizer, the base model and the adapter to `output`.
+
+    This is the only step that needs the hub (or a warm hub cache).
+    `load_specter2()` reads the snapshot without any hub resolution.
+
+    An existing snapshot at `output` is replaced; any other non-empty
+    directory is left alone. The files are hashed into `MANIFEST`, so caches
+    can be keyed on the snapshot's contents.
+
+    The snapshot is exported next to `output` and swapped in once it is
+    complete, so a failed export (e.g., without network access) keeps the
+    existing snapshot and leaves nothing behind.
+    """
+    if output.exists() and any(output.iterdir()) and not (output / MANIFEST).exists():
+        raise FileExistsError(f"{output} is not empty and is not a SPECTER2 snapshot")
+    output.parent.mkdir(parents=True, exist_ok=True)
+
+    tmp = Path(tempfile.mkdtemp(prefix=f".{output.name}.tmp-", dir=output.parent))
+    try:
+        tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL)
+        tokenizer.save_pretrained(tmp / "tokenizer")
+        model = AutoAdapterModel.from_pretrained(BASE_MODEL)
+        model.save_pretrained(tmp / "model")
+        model.load_adapter(ADAPTER, source="hf", load_as=ADAPTER_NAME, set_active=True)
+        model.save_adapter(str(tmp / "adapter"), ADAPTER_NAME)
+
+        h = hashlib.sha256()
+        for file in sorted(p for p in tmp.rglob("*") if p.is_file()):
+            h.update(f"{file.relative_to(tmp)}\0".encode())
+            with open(file, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+        (tmp / MANIFEST).write_text(json.dumps({"digest": h.hexdigest()}))
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    if output.exists():
+        old = Path(tempfile.mkdtemp(prefix=f".{output.name}.old-", dir=output.parent))
+        output.rename(old / output.name)
+        tmp.rename(output)
+        shutil.rmtree(old)
+    else:
+        tmp.rename(output)
+
+
+def load_specter2(
+    snapshot: Union[str, Path],
+    device: torch.device
+) -> tuple[PreTrainedTokenizerBase, PreTrainedModel]:
+    """Load the tokenizer and the model from a snapshot saved by `export_specter2()`.
+
+    Only local files are read, so this works without network access.
+    """
+    snapshot = Path(snapshot)
+    if not (snapshot / MANIFEST).exists():
+        raise FileNotFoundError(f"no complete SPECTER2 snapshot at {snapshot} "
+                                "(create it with scripts/export_model.py)")
+
+    tokenizer = AutoTokenizer.from_pretrained(snapshot / "tokenizer", local_files_only=True)
+    model = AutoAdapterModel.from_pretrained(snapshot / "model", local_files_only=True)
+    model.load_adapter(str(snapshot / "adapter"), load_as=ADAPTER_NAME, set_active=True)
+    model.eval()
+    return tokenizer, model.to(device)
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import queue
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+import torch
+from transformers import PreTrainedTokenizerBase
+
+
+CHUNK_SIZE: int = 4096
+"""Number of documents passed to the tokenizer at once."""
+FILES: tuple[str, ...] = ("meta.json", "tokens.npy", "offsets.npy")
+"""The files of a tokenized corpus (meta.json first, so that it is removed first)."""
+
+
+def _digest(texts: list[str], tokenizer: PreTrainedTokenizerBase, max_length: int) -> str:
+    """Identify the tokenized corpus by its texts and the tokenizer's settings."""
+    h = hashlib.sha256()
+    h.update(f"{type(tokenizer).__name__}:{len(tokenizer)}:{max_length}\0".encode())
+    h.update(json.dumps(tokenizer.get_vocab(), sort_keys=True).encode())
+    for text in texts:
+        h.update(text.encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class TokenizedCorpus:
+    """Input IDs of a corpus, stored as a flat token array plus offsets.
+
+    The IDs of document `i` are `tokens[offsets[i]:offsets[i + 1]]`. Both
+    arrays are memory-mapped `.npy` files, so opening the corpus is free and
+    only the batches that are actually used are read.
+    """
+
+    def __init__(self, path: Path):
+        self.tokens: np.ndarray = np.load(path / "tokens.npy", mmap_mode='r')
+        self.offsets: np.ndarray = np.load(path / "offsets.npy", mmap_mode='r')
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def batch(self, start: int, stop: int, pad_token_id: int) -> dict[str, torch.Tensor]:
+        """Pad documents `start:stop` to the longest one, like the tokenizer does."""
+        stop = min(stop, len(self))
+        lengths = np.diff(self.offsets[start : stop + 1])
+        input_ids = np.full((stop - start, lengths.max()), pad_token_id, dtype=np.int64)
+        attention_mask = np.zeros_like(input_ids)
+        for row, (begin, length) in enumerate(zip(self.offsets[start:stop], lengths)):
+            input_ids[row, :length] = self.tokens[begin : begin + length]
+            attention_mask[row, :length] = 1
+        return {
+            "input_ids": torch.from_numpy(input_ids),
+            "attention_mask": torch.from_numpy(attention_mask),
+        }
+
+    @classmethod
+    def build(
+        cls,
+        texts: list[str],
+        tokenizer: PreTrainedTokenizerBase,
+        path: Path,
+        max_length: int = 512
+    ) -> "TokenizedCorpus":
+        """Tokenize `texts` and store them at `path`, unless they already are.
+
+        The tokenizer is called on large chunks of documents, which a fast
+        tokenizer encodes in parallel (in Rust, across all cores).
+        """
+        digest = _digest(texts, tokenizer, max_length)
+        meta_path = path / "meta.json"
+        if meta_path.exists() and json.loads(meta_path.read_text()).get("digest") == digest:
+            return cls(path)
+
+        ids: list[list[int]] = []
+        for i in range(0, len(texts), CHUNK_SIZE):
+            ids.extend(tokenizer(texts[i : i + CHUNK_SIZE], truncation=True,
+                                 max_length=max_length, return_token_type_ids=False,
+                                 return_attention_mask=False)["input_ids"])
+
+        lengths = np.fromiter((len(x) for x in ids), dtype=np.int64, count=len(ids))
+        offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        tokens = np.concatenate([np.zeros(0, dtype=np.int32)]
+                                + [np.asarray(x, dtype=np.int32) for x in ids])
+
+        # build next to `path` and swap it in, so that an interrupted build never
+        # leaves a meta.json next to arrays it does not describe
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(tempfile.mkdtemp(prefix=f".{path.name}.tmp-", dir=path.parent))
+        try:
+            np.save(tmp / "offsets.npy", offsets)
+            np.save(tmp / "tokens.npy", tokens)
+            (tmp / "meta.json").write_text(json.dumps({
+                "digest": digest,
+                "num_docs": len(texts),
+                "max_length": max_length,
+            }))
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        if path.exists():
+            for name in FILES:
+                (path / name).unlink(missing_ok=True)
+            path.rmdir()
+        tmp.rename(path)
+        return cls(path)
+
+
+def prefetch_batches(
+    corpus: TokenizedCorpus,
+    batch_size: int,
+    pad_token_id: int,
+    device: Optional[torch.device] = None,
+    prefetch: int = 4
+) -> Iterator[dict[str, torch.Tensor]]:
+    """Yield padded batches of `corpus`, built on a background thread.
+
+    Up to `prefetch` batches are prepared (and moved to `device`) while the
+    caller runs inference on the previous ones.
+    """
+    q: queue.Queue = queue.Queue(maxsize=prefetch)
+    done = object()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for i in range(0, len(corpus), batch_size):
+                if stop.is_set():
+                    return
+                batch = corpus.batch(i, i + batch_size, pad_token_id)
+                if device is not None:
+                    batch = {k: v.to(device, non_blocking=True) for k, v in batch.items()}
+                q.put(batch)
+        except BaseException as e:
+            q.put(e)
+        finally:
+            q.put(done)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while (item := q.get()) is not done:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        while thread.is_alive():
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                thread.join(timeout=0.01)
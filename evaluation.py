@@ -1,4 +1,12 @@
 import argparse
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+
+from cglp.config import load_config
+from cglp.data.utils import ALIASES_SUFFIX, sidecar_path
+from cglp.metrics import Metrics
 
 ################################################
 #               IMPORTANT                      #
@@ -6,13 +14,107 @@ import argparse
 # 1. Do not print anything other than the ranked list of papers.
 # 2. Do not forget to remove all the debug prints while submitting.
 
+def aliases_path(config: dict) -> Path:
+    """Path of the duplicates removed by `scripts/preprocess_dataset.py --dedup`."""
+    return sidecar_path(config["dataset"], ALIASES_SUFFIX)
+
+
+def cache_path(config: dict, title: str, abstract: str) -> Optional[Path]:
+    """Path of the cached ranking for the given query, if caching is enabled.
+
+    The key includes the size and modification time of the dataset, its
+    aliases and the embeddings, and the digest of the model snapshot, so
+    regenerating any of them invalidates the cache.
+    """
+    if not config.get("cache"):
+        return None
+    key = hashlib.sha256()
+    for artifact in (config["dataset"], config["embeddings"], aliases_path(config)):
+        if Path(artifact).exists():
+            stat = Path(artifact).stat()
+            key.update(f"{artifact}:{stat.st_size}:{stat.st_mtime_ns}\0".encode())
+    # written by cglp.model.export_specter2(), which is not imported to keep this cheap
+    manifest = Path(config["model"]) / "snapshot.json"
+    if not manifest.exists():
+        raise FileNotFoundError(f"no complete SPECTER2 snapshot at {config['model']} "
+                                "(create it with scripts/export_model.py)")
+    key.update(manifest.read_bytes())
+    key.update(title.encode())
+    key.update(b"\0")
+    key.update(abstract.encode())
+    return Path(config["cache"]) / "rankings" / key.hexdigest()
+
+
+def rank_by_similarity(embeddings, embedding) -> list[int]:
+    """Indices of `embeddings` sorted by decreasing cosine similarity with `embedding`."""
+    import torch
+    from torch.nn.functional import cosine_similarity
+
+    sims = cosine_similarity(embeddings, embedding, dim=1)
+    return torch.argsort(sims, descending=True).tolist()
+
 
+def rank(config: dict, title: str, abstract: str, metrics: Metrics) -> list[str]:
+    """Rank all papers in the dataset by cosine similarity with the query paper.
+
+    Near-duplicates removed from the dataset are ranked right after the paper
+    kept in their place. Heavy imports are done here, so that cache hits never
+    pay for them.
+    """
+    with metrics.stage("import torch"):
+        import torch
+
+    from cglp.data import arXivId, load_dataset
+
+    with metrics.stage("load dataset"):
+        import json
+
+        dataset = load_dataset(config["dataset"])
+        idx_to_arxiv_id: dict[int, arXivId] = {id: arxiv_id
+                                               for id, arxiv_id in enumerate(sorted(dataset))}
+        duplicates: dict[arXivId, list[arXivId]] = {}
+        if aliases_path(config).exists():
+            for alias, kept in sorted(json.loads(aliases_path(config).read_text()).items()):
+                duplicates.setdefault(kept, []).append(alias)
+
+    with metrics.stage("load embeddings"):
+        device = torch.device(config["device"] if torch.cuda.is_available() else "cpu")
+        embeddings: torch.Tensor = torch.load(config["embeddings"]).to(device)
+
+    with metrics.stage("import transformers"):
+        from cglp.model import load_specter2
+
+    with metrics.stage("load model"):
+        tokenizer, model = load_specter2(config["model"], device)
+
+    with metrics.stage("forward pass") as stage:
+        input = tokenizer([title + tokenizer.sep_token + abstract],
+                          padding=True, truncation=True, return_tensors="pt",
+                          return_token_type_ids=False, max_length=512)
+        input = {k: v.to(device) for k, v in input.items()}
+        stage.count("tokens", input["input_ids"].numel())
+        with torch.no_grad():
+            output = model(**input)
+        embedding = output.last_hidden_state[:, 0, :]
+
+    with metrics.stage("ranking") as stage:
+        stage.count("papers", len(embeddings))
+        ranking: list[arXivId] = []
+        for idx in rank_by_similarity(embeddings, embedding):
+            ranking.append(idx_to_arxiv_id[idx])
+            ranking.extend(duplicates.get(idx_to_arxiv_id[idx], ()))
+        return ranking
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--test-paper-title", type=str, required=True)
     parser.add_argument("--test-paper-abstract", type=str, required=True)
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="report time spent in each phase on stderr")
+    parser.add_argument("--metrics", type=Path,
+                        help="write stage timings, peak memory and throughput as json "
+                             "to this path")
     args = parser.parse_args()
 
     # print(args)
@@ -21,38 +123,30 @@ def main():
     #               YOUR CODE START                #
     ################################################
 
-    import torch
-    from adapters import AutoAdapterModel
-    from omegaconf import OmegaConf
-    from torch.nn.functional import cosine_similarity
-    from transformers import AutoTokenizer
-
-    from cglp.data import arXivId, load_dataset
-
-
-    config = OmegaConf.load("config/evaluation.yaml")
-    device = torch.device(config.device if torch.cuda.is_available() else "cpu")
-    dataset = load_dataset(config.dataset)
-    embeddings: torch.Tensor = torch.load(config.embeddings)
-
-    idx_to_arxiv_id: dict[int, arXivId] = {id: arxiv_id
-                                           for id, arxiv_id in enumerate(sorted(dataset.keys()))}
-
-    tokenizer = AutoTokenizer.from_pretrained("allenai/specter2_base")
-    model = AutoAdapterModel.from_pretrained("allenai/specter2_base")
-    model.load_adapter("allenai/specter2", source="hf", load_as="specter2", set_active=True)
-    model = model.to(device)
-
-    input = tokenizer([args.test_paper_title + tokenizer.sep_token + args.test_paper_abstract],
-                      padding=True, truncation=True, return_tensors="pt",
-                      return_token_type_ids=False, max_length=512)
-    input = {k: v.to(device) for k, v in input.items()}
-    with torch.no_grad():
-        output = model(**input)
-    embedding = output.last_hidden_state[:, 0, :]
-
-    sims = cosine_similarity(embeddings.to(device), embedding.to(device), dim=1)
-    result = [idx_to_arxiv_id[idx] for idx in torch.argsort(sims, descending=True).tolist()]
+    metrics = Metrics()
+
+    with metrics.stage("load config"):
+        config: dict = load_config()
+
+    with metrics.stage("cache lookup"):
+        cached = cache_path(config, args.test_paper_title, args.test_paper_abstract)
+        result: Optional[list[str]] = None
+        if cached is not None and cached.exists():
+            result = cached.read_text().split('\n')
+
+    if result is None:
+        result = rank(config, args.test_paper_title, args.test_paper_abstract, metrics)
+        if cached is not None:
+            with metrics.stage("cache store"):
+                cached.parent.mkdir(parents=True, exist_ok=True)
+                tmp = cached.with_name(f"{cached.name}.{os.getpid()}")
+                tmp.write_text('\n'.join(result))
+                tmp.replace(cached)
+
+    if args.profile_startup:
+        metrics.report()
+    if args.metrics:
+        metrics.write(args.metrics)
 
     ################################################
     #               YOUR CODE END                  #
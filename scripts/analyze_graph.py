@@ -1,14 +1,18 @@
 import argparse
 import json
+import random
+import sys
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 import matplotlib.pyplot as plt
 import networkx as nx
 import numpy as np
 from matplotlib.figure import Figure
 
-from cglp.data import Paper, load_dataset, paperId
+from cglp.data import CitationGraph, load_citation_graph
+from cglp.metrics import Metrics
 
 
 def parse_args():
@@ -24,21 +28,22 @@ def parse_args():
     parser.add_argument("--out-hist", type=Path, default="output/hist_out_deg.svg",
                         help="path to save the out-degree histogram to "
                              "(default: output/hist_out_deg.svg).")
+    parser.add_argument("--metrics", type=Path,
+                        help="write stage timings, peak memory and throughput as json "
+                             "to this path")
     return parser.parse_args()
 
 
-def create_graph(papers: dict[paperId, Paper]) -> nx.DiGraph:
+def create_graph(citations: CitationGraph) -> nx.DiGraph:
     """Create a directed citation graph.
 
     For each paper $v$ cited by a paper $u$, there is an edge $(u, v)$
-    in the graph.
+    in the graph. Nodes are the integer node IDs of `citations`; node `i` is
+    the paper `citations.nodes[i]`.
     """
     graph = nx.DiGraph()
-    for paper_id, paper in papers.items():
-        graph.add_node(paper_id)
-        for ref_id in paper.references:
-            if ref_id in papers:
-                graph.add_edge(paper_id, ref_id)
+    graph.add_nodes_from(range(len(citations.nodes)))
+    graph.add_edges_from(citations.edges.tolist())
     return graph
 
 
@@ -51,13 +56,24 @@ class Stats:
     diameter: int
 
 
-def get_stats(graph: nx.DiGraph) -> Stats:
-    """Get statistics required by the problem statement."""
+def get_stats(graph: nx.DiGraph, diameter_sources: Optional[int] = None) -> Stats:
+    """Get statistics required by the problem statement.
+
+    The diameter of the largest SCC takes a BFS from every node. With
+    `diameter_sources`, only that many (seeded) random nodes are used, which
+    gives a lower bound on the diameter in time linear in the size of the SCC.
+    """
     num_edges: int = graph.number_of_edges()
     avg_node_deg: float = num_edges / graph.number_of_nodes()
     num_isolated_nodes: int = len(list(nx.isolates(graph)))
     largest_scc = max(list(nx.strongly_connected_components(graph)), key=len)
-    diameter: int = nx.diameter(graph.subgraph(largest_scc))
+    scc = graph.subgraph(largest_scc)
+    if diameter_sources is None or diameter_sources >= len(largest_scc):
+        diameter: int = nx.diameter(scc)
+    else:
+        sources = random.Random(0).sample(sorted(largest_scc), diameter_sources)
+        diameter = max(max(nx.single_source_shortest_path_length(scc, source).values())
+                       for source in sources)
     return Stats(
         num_edges=num_edges,
         num_isolated_nodes=num_isolated_nodes,
@@ -88,20 +104,36 @@ def get_deg_hist(graph: nx.DiGraph) -> list[Figure]:
 
 def main():
     args = parse_args()
-
-    papers: dict[paperId, Paper] = load_dataset(args.data)
-
-    graph: nx.DiGraph = create_graph(papers)
-
-    figures: list[Figure] = get_deg_hist(graph)
-    for fig, path in zip(figures, [args.in_hist, args.out_hist]):
-        path.parent.mkdir(parents=True, exist_ok=True)
-        fig.savefig(path, bbox_inches="tight")
-
-    stats: Stats = get_stats(graph)
-    args.stats.parent.mkdir(parents=True, exist_ok=True)
-    with open(args.stats, 'w') as f:
-        json.dump(stats.__dict__, f)
+    metrics = Metrics()
+
+    with metrics.stage("load dataset") as stage:
+        # references are resolved across arXiv IDs and paperIds with the dataset's IdIndex
+        papers, citations = load_citation_graph(args.data)
+        stage.count("papers", len(papers))
+        stage.count("unresolved references", citations.unresolved)
+    if citations.unresolved:
+        print(f"warning: {citations.unresolved} references to papers that are not in the "
+              "dataset", file=sys.stderr)
+
+    with metrics.stage("create graph") as stage:
+        graph: nx.DiGraph = create_graph(citations)
+        stage.count("papers", graph.number_of_nodes())
+        stage.count("edges", graph.number_of_edges())
+
+    with metrics.stage("histograms"):
+        figures: list[Figure] = get_deg_hist(graph)
+        for fig, path in zip(figures, [args.in_hist, args.out_hist]):
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fig.savefig(path, bbox_inches="tight")
+
+    with metrics.stage("stats"):
+        stats: Stats = get_stats(graph)
+        args.stats.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.stats, 'w') as f:
+            json.dump(stats.__dict__, f)
+
+    if args.metrics:
+        metrics.write(args.metrics)
 
 
 if __name__ == "__main__":
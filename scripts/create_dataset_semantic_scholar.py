@@ -10,13 +10,15 @@ import time
 from collections import defaultdict
 from pathlib import Path
 from tempfile import TemporaryDirectory
-from typing import Union
+from typing import Optional, Union
 
 import requests
 from requests.models import HTTPError, Response
 from tqdm import tqdm
 
-from cglp.data import Paper, save_dataset
+from cglp.data import IdIndex, Paper, save_dataset, sidecar_path
+from cglp.data.utils import ALIASES_SUFFIX, MANIFEST_SUFFIX, SIGNATURES_SUFFIX
+from cglp.metrics import Metrics, Stage
 
 paperId = str
 """The unique identifier for a paper assigned by Semantic Scholar."""
@@ -46,6 +48,9 @@ def parse_args():
     parser.add_argument(
         "--json", nargs='?', type=Path, const="data/dataset.json",
         help="save the dataset as json (the path is optional and defaults to data/dataset.json)")
+    parser.add_argument(
+        "--metrics", type=Path,
+        help="write stage timings, peak memory and throughput as json to this path")
     return parser.parse_args()
 
 
@@ -87,8 +92,13 @@ def get_papers(
     ta_dataset: Path,
     filename: Path,
     make_requests: bool = False,
-    clean: bool = False
-) -> dict[paperId, Paper]:
+    clean: bool = False,
+    stage: Optional[Stage] = None
+) -> tuple[dict[paperId, Paper], IdIndex]:
+    """Get the papers (keyed by paperId) and the map between their arXiv IDs and paperIds.
+
+    The map also covers the references whose arXiv IDs Semantic Scholar knows.
+    """
     arxiv_ids: list[arXivId] = sorted(os.listdir(ta_dataset))
 
     paper_data: dict[arXivId, dict[str, Union[int, str, list[dict[str, str]]]]] = {}
@@ -109,9 +119,11 @@ def get_papers(
             logger.info("sending request...")
             r: Response = requests.post(
                 "https://api.semanticscholar.org/graph/v1/paper/batch",
-                params={"fields": "referenceCount,references"},
+                params={"fields": "referenceCount,references,references.externalIds"},
                 json={"ids": ids}
             )
+            if stage is not None:
+                stage.count("requests")
             try:
                 r.raise_for_status()
             except HTTPError as e:
@@ -127,7 +139,7 @@ def get_papers(
         logger.warning(f"no data found for {len(missing_ids)} papers: {', '.join(missing_ids)}")
 
     papers: dict[paperId, Paper] = {}
-    arxiv_id_to_paper_id: dict[arXivId, paperId] = {}
+    id_index = IdIndex()
 
     bad_data: int = 0
     incomplete_references: int = 0
@@ -159,7 +171,7 @@ def get_papers(
             if clean:
                 del paper_data[arxiv_id]
             continue
-        arxiv_id_to_paper_id[arxiv_id] = paper_id
+        id_index.add(arxiv_id, paper_id)
         if len(references) < int(0.75 * ref_count):
             logger.warning(f"incomplete references for paper arXiv:{arxiv_id}: "
                            f"referenceCount == {ref_count} != {len(references)}")
@@ -172,13 +184,20 @@ def get_papers(
             title: str = f.read()
         with open(ta_dataset/arxiv_id/"abstract.txt", 'r') as f:
             abstract: str = f.read()
-        papers[paper_id] = Paper(title, abstract, arxiv_id,
-                                 set(paper["paperId"] for paper in references))
+        for ref in references:
+            ref_arxiv_id = (ref.get("externalIds") or {}).get("ArXiv")
+            if ref.get("paperId") and ref_arxiv_id:
+                id_index.add(ref_arxiv_id, ref["paperId"], ingested=False)
+        # references that Semantic Scholar could not resolve have no paperId
+        papers[paper_id] = Paper(title, abstract,
+                                 set(ref["paperId"] for ref in references if ref.get("paperId")))
     if incomplete_references:
         logger.warning(f"{incomplete_references} incomplete references")
     if bad_data:
         logger.warning(f"{bad_data} papers with bad data")
-    return papers
+    if stage is not None:
+        stage.count("papers", len(papers))
+    return papers, id_index
 
 
 
@@ -187,25 +206,41 @@ def main():
     args = parse_args()
     setup_logger()
 
+    metrics = Metrics()
     papers: dict[paperId, Paper] = {}
+    id_index = IdIndex()
     if os.path.isdir(args.data):
-        clean_dataset(args.data)
-        papers = get_papers(args.data, args.log, args.request, args.clean)
+        with metrics.stage("clean"):
+            clean_dataset(args.data)
+        with metrics.stage("get papers") as stage:
+            papers, id_index = get_papers(args.data, args.log, args.request, args.clean, stage)
     elif tarfile.is_tarfile(args.data):
         with tarfile.open(args.data, mode='r') as tar:
             with TemporaryDirectory() as tmpdir:
-                tar.extractall(path=tmpdir, filter="data")
-                clean_dataset(tmpdir/Path("dataset_papers"))
-                papers = get_papers(
-                    tmpdir/Path("dataset_papers"), args.log, args.request, args.clean)
+                with metrics.stage("extract"):
+                    tar.extractall(path=tmpdir, filter="data")
+                with metrics.stage("clean"):
+                    clean_dataset(tmpdir/Path("dataset_papers"))
+                with metrics.stage("get papers") as stage:
+                    papers, id_index = get_papers(tmpdir/Path("dataset_papers"), args.log,
+                                                  args.request, args.clean, stage)
     else:
         print(f"Error: {args.data} is neither a tarball nor a directory", file=sys.stderr)
         exit(1)
 
-    if args.json:
-        save_dataset(papers, args.output, args.json)
-    else:
-        save_dataset(papers, args.output)
+    with metrics.stage("save") as stage:
+        stage.count("papers", len(papers))
+        if args.json:
+            save_dataset(papers, args.output, args.json)
+        else:
+            save_dataset(papers, args.output)
+        id_index.save(IdIndex.path_for(args.output))
+        # the sidecars of scripts/preprocess_dataset.py describe an arXiv-keyed dataset
+        for suffix in (MANIFEST_SUFFIX, ALIASES_SUFFIX, SIGNATURES_SUFFIX):
+            sidecar_path(args.output, suffix).unlink(missing_ok=True)
+
+    if args.metrics:
+        metrics.write(args.metrics)
 
 
 if __name__ == "__main__":
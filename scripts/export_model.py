@@ -0,0 +1,21 @@
+import argparse
+from pathlib import Path
+
+from cglp.config import CONFIG, load_config
+from cglp.model import export_specter2
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-o", "--output", type=Path, default=load_config()["model"],
+                        help=f"path to save the model snapshot to (default: `model` in {CONFIG}).")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    export_specter2(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,12 @@ import argparse
 from pathlib import Path
 
 import torch
-from adapters import AutoAdapterModel
-from transformers import AutoTokenizer
 from tqdm import tqdm
 
+from cglp.config import CONFIG, load_config
 from cglp.data import Paper, arXivId, load_dataset
+from cglp.metrics import Metrics
+from cglp.model import TokenizedCorpus, load_specter2, prefetch_batches
 
 
 def parse_args() -> argparse.Namespace:
@@ -15,48 +16,69 @@ def parse_args() -> argparse.Namespace:
                         help="path to the preprocessed dataset (default: data/dataset).")
     parser.add_argument("-o", "--output", type=Path, default="data/embeddings",
                         help="path to save the embeddings (default: data/embeddings).")
+    parser.add_argument("-m", "--model", type=Path, default=load_config()["model"],
+                        help="path to the model snapshot saved by scripts/export_model.py "
+                             f"(default: `model` in {CONFIG}).")
+    parser.add_argument("-t", "--tokens", type=Path, default="data/tokens",
+                        help="directory to cache the tokenized dataset in (default: data/tokens).")
     parser.add_argument("--device", type=torch.device, default="cuda",
                         help="device to use for generating embeddings")
     parser.add_argument("--batch-size", type=int, default=128,
                         help="batch size to use for generating embeddings")
+    parser.add_argument("--metrics", type=Path,
+                        help="write stage timings, peak memory and throughput as json "
+                             "to this path")
     return parser.parse_args()
 
 
 def generate_embeddings(
     dataset: dict[arXivId, Paper],
+    model_path: Path,
+    tokens_path: Path,
     device: torch.device,
-    batch_size: int
+    batch_size: int,
+    metrics: Metrics
 ) -> torch.Tensor:
     """Generate embeddings for the nodes in the given citation graph."""
-    tokenizer = AutoTokenizer.from_pretrained("allenai/specter2_base")
-    model = AutoAdapterModel.from_pretrained("allenai/specter2_base")
-    model.load_adapter("allenai/specter2", source="hf", load_as="specter2", set_active=True)
-    model = model.to(device)
-
-    nodes: list[str] = [paper.title + tokenizer.sep_token + paper.abstract
-                        for _, paper in sorted(dataset.items())]
-
-    embeddings = torch.zeros((len(nodes), 768))
-    for i in tqdm(range(0, len(nodes), batch_size)):
-        batch_data = nodes[i:i + batch_size]
-        inputs = tokenizer(batch_data, padding=True, truncation=True, return_tensors="pt",
-                           return_token_type_ids=False, max_length=512)
-        inputs = {k: v.to(device) for k, v in inputs.items()}
-        with torch.no_grad():
-            outputs = model(**inputs)
-        batch_embeddings = outputs.last_hidden_state[:, 0, :]
-        embeddings[i : i + len(batch_data)] = batch_embeddings.cpu()
+    with metrics.stage("load model"):
+        tokenizer, model = load_specter2(model_path, device)
+
+    with metrics.stage("tokenize") as stage:
+        nodes: list[str] = [paper.title + tokenizer.sep_token + paper.abstract
+                            for _, paper in sorted(dataset.items())]
+        corpus = TokenizedCorpus.build(nodes, tokenizer, tokens_path, max_length=512)
+        stage.count("papers", len(corpus))
+        stage.count("tokens", len(corpus.tokens))
+
+    with metrics.stage("encode") as stage:
+        embeddings = torch.zeros((len(nodes), 768))
+        batches = prefetch_batches(corpus, batch_size, tokenizer.pad_token_id, device)
+        for i, inputs in zip(tqdm(range(0, len(nodes), batch_size)), batches):
+            with torch.no_grad():
+                outputs = model(**inputs)
+            batch_embeddings = outputs.last_hidden_state[:, 0, :]
+            embeddings[i : i + len(batch_embeddings)] = batch_embeddings.cpu()
+            stage.count("papers", len(batch_embeddings))
+            stage.count("tokens", int(inputs["attention_mask"].sum()))
     return embeddings
 
 
 def main():
     args = parse_args()
+    metrics = Metrics()
+
+    with metrics.stage("load dataset") as stage:
+        dataset: dict[arXivId, Paper] = load_dataset(args.data)
+        stage.count("papers", len(dataset))
 
-    dataset: dict[arXivId, Paper] = load_dataset(args.data)
+    embeddings = generate_embeddings(dataset, args.model, args.tokens, args.device,
+                                     args.batch_size, metrics)
+    with metrics.stage("save"):
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        torch.save(embeddings, args.output)
 
-    embeddings = generate_embeddings(dataset, args.device, args.batch_size)
-    args.output.parent.mkdir(parents=True, exist_ok=True)
-    torch.save(embeddings, args.output)
+    if args.metrics:
+        metrics.write(args.metrics)
 
 
 if __name__ == "__main__":
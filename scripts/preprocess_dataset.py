@@ -1,4 +1,6 @@
 import argparse
+import hashlib
+import json
 import logging
 import os
 import re
@@ -10,10 +12,15 @@ from pathlib import Path
 from typing import Optional
 
 import bibtexparser as bp
+import numpy as np
 from rapidfuzz import fuzz
 from tqdm import tqdm
 
-from cglp.data import Paper, save_dataset
+from cglp.data import IdIndex, Paper, append_dataset, load_dataset, save_dataset, sidecar_path
+from cglp.data.dedup import (compute_signatures, find_duplicates, load_signatures,
+                             save_signatures, simplify)
+from cglp.data.utils import ALIASES_SUFFIX, MANIFEST_SUFFIX, SIGNATURES_SUFFIX
+from cglp.metrics import Metrics, Stage
 
 
 arXivId = str
@@ -51,6 +58,13 @@ def parse_args():
         help="path to store the processed dataset (default: data/dataset)")
     parser.add_argument("--clean", action="store_true", help="stop after cleaning dataset")
     parser.add_argument("--preprocess", action="store_true", help="stop after preprocessing dataset")
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="only process new or changed papers and append them to the existing dataset")
+    parser.add_argument(
+        "--dedup", action="store_true",
+        help="remove near-duplicate papers (e.g., cross-listed ones or with near-identical "
+             "titles and abstracts)")
     parser.add_argument(
         "--log", nargs="?", type=Path, const="/tmp/cs768-citations",
         help="log to a fifo (the path is optional and defaults to /tmp/cs768-citations)"
@@ -58,6 +72,9 @@ def parse_args():
     parser.add_argument(
         "--json", nargs='?', type=Path, const="data/dataset.json",
         help="save the dataset as json (the path is optional and defaults to data/dataset.json)")
+    parser.add_argument(
+        "--metrics", type=Path,
+        help="write stage timings, peak memory and throughput as json to this path")
     return parser.parse_args()
 
 
@@ -104,10 +121,15 @@ def clean_dataset(ta_dataset: Path):
             chosen.rename(target)
 
 
-def process_bibliographies(dataset: Path) -> list[tuple[arXivId, str]]:
-    """Processes bib and bbl files."""
+def process_bibliographies(
+    dataset: Path,
+    ids: Optional[list[arXivId]] = None
+) -> list[tuple[arXivId, str]]:
+    """Processes bib and bbl files (of only the papers in `ids`, if given)."""
     bibs: list[tuple[arXivId, str]] = []
-    for dir in tqdm([dataset / dir for dir in sorted(os.listdir(dataset), reverse=True)],
+    if ids is None:
+        ids = os.listdir(dataset)
+    for dir in tqdm([dataset / dir for dir in sorted(ids, reverse=True)],
                     desc="Simplifying references"):
         bib_file: Path = dir / BIB_FILE
         if bib_file.exists():
@@ -135,65 +157,290 @@ def process_bibliographies(dataset: Path) -> list[tuple[arXivId, str]]:
     return bibs
 
 
-def _get_cites(item: tuple[arXivId, str, list[str], dict[arXivId, Paper]]):
-    citing_id, refs, titles, papers = item
+def _get_cites(item: tuple[arXivId, str, list[tuple[arXivId, str]]]):
+    citing_id, refs, titles = item
     cites: list[tuple[arXivId, arXivId, str]] = []
+    comparisons: int = 0
     citing_year = int(citing_id[2:4])
     logger.info(f"processing citations for {citing_id}...")
     for cited_id, title in titles:
         if int(cited_id[2:4]) > citing_year + 3:
             continue
+        comparisons += 1
         if fuzz.partial_ratio(title, refs) > 95:
             cites.append((citing_id, cited_id, title))
-            papers[citing_id].references.add(cited_id)
-    return cites
+    return cites, comparisons
 
 
-def get_papers(dataset: Path, bibs: list[tuple[arXivId, str]]) -> dict[arXivId, Paper]:
-    papers: dict[arXivId, Paper] = {}
-    simple_titles: list[tuple[arXivId, str]] = []
-    for p in tqdm(dataset.iterdir(), desc="Initializing papers"):
-        papers[p.name] = Paper(
-            (p / "title.txt").read_text(encoding="utf-8").strip(),
-            (p / "abstract.txt").read_text(encoding="utf-8").strip(),
-            set()
-        )
-        simple_titles.append((p.name, re.sub(r"[^ a-z0-9]", "", papers[p.name].title.lower())))
+def read_paper(dir: Path) -> Paper:
+    """Read a paper (without references) from its directory in the assignment dataset."""
+    return Paper(
+        (dir / "title.txt").read_text(encoding="utf-8").strip(),
+        (dir / "abstract.txt").read_text(encoding="utf-8").strip(),
+        set()
+    )
+
 
+def match_citations(
+    jobs: list[tuple[arXivId, str, list[tuple[arXivId, str]]]],
+    papers: dict[arXivId, Paper],
+    stage: Optional[Stage] = None
+) -> set[arXivId]:
+    """Match each bibliography against the given titles and add the citations to `papers`.
+
+    Each job is a citing paper, its bibliography and the (simplified) titles to
+    look for in it. Returns the IDs of the papers that got new references.
+    """
     logger.info("getting references...")
-    jobs = [(id, bib, simple_titles, papers) for id, bib in bibs]
+    updated: set[arXivId] = set()
     with ProcessPoolExecutor(max_workers=6) as exe:
-        for cites in tqdm(exe.map(_get_cites, jobs),
-                          total=len(jobs),
-                          desc="Getting references"):
+        for cites, comparisons in tqdm(exe.map(_get_cites, jobs),
+                                       total=len(jobs),
+                                       desc="Getting references"):
+            if stage is not None:
+                stage.count("bibliographies")
+                stage.count("fuzzy comparisons", comparisons)
+                stage.count("citations", len(cites))
             for citing_id, cited_id, simple_title in cites:
+                papers[citing_id].references.add(cited_id)
+                updated.add(citing_id)
                 logger.info(f"{logger.CYAN}arXiv:{citing_id:<10}{logger.RESET}"
                             f" cites {logger.MAGENTA}arXiv:{cited_id:<10}{logger.RESET}: "
                             f"{logger.YELLOW}{simple_title}{logger.RESET}")
-    return papers
+    return updated
 
 
-def main():
-    args = parse_args()
-    setup_logger(args.log)
+def deduplicate(
+    papers: dict[arXivId, Paper],
+    bibs: dict[arXivId, str],
+    signatures: dict[arXivId, np.ndarray],
+    candidates: Optional[set[arXivId]] = None,
+    stage: Optional[Stage] = None
+) -> dict[arXivId, arXivId]:
+    """Collapse clusters of near-duplicate papers into one paper each.
+
+    Near-duplicates (cross-listed papers, papers with near-identical titles and
+    abstracts, etc.) are found with MinHash and LSH over the simplified titles
+    and abstracts. The paper with the longest bibliography in each cluster is
+    kept, and the others are removed from `papers`. Only the papers in
+    `candidates` (all papers if `None`) can be removed.
+
+    `signatures` holds the MinHash signatures of earlier runs; only the papers
+    without one are hashed, and the signatures of papers that are no longer in
+    `papers` are dropped.
 
+    Returns the map from each removed paper to the paper kept in its place.
+    """
+    for id in signatures.keys() - papers.keys():
+        del signatures[id]
+    signatures.update(compute_signatures({
+        id: simplify(paper.title) + " " + simplify(paper.abstract)
+        for id, paper in papers.items() if id not in signatures
+    }))
+    clusters = find_duplicates(signatures)
+    aliases: dict[arXivId, arXivId] = {}
+    for cluster in clusters:
+        kept = min(cluster, key=lambda id: (candidates is not None and id in candidates,
+                                            -len(bibs.get(id, "")), id))
+        for id in cluster:
+            if id != kept and (candidates is None or id in candidates):
+                logger.info(f"removing arXiv:{id} as a duplicate of arXiv:{kept}")
+                aliases[id] = kept
+                del papers[id]
+                del signatures[id]
+    if stage is not None:
+        stage.count("duplicates", len(aliases))
+    return aliases
+
+
+def get_papers(
+    dataset: Path,
+    bibs: list[tuple[arXivId, str]],
+    stage: Optional[Stage] = None,
+    signatures: Optional[dict[arXivId, np.ndarray]] = None
+) -> tuple[dict[arXivId, Paper], dict[arXivId, arXivId]]:
+    """Read the papers, remove near-duplicates (with `signatures`) and match the citations.
+
+    Returns the papers and the map from removed duplicates to kept papers.
+    """
     papers: dict[arXivId, Paper] = {}
-    if args.data.is_dir():
-        clean_dataset(args.data)
-        if args.clean:
-            return
-        refs_files: list[tuple[arXivId, str]] = process_bibliographies(args.data)
-        if args.preprocess:
-            return
-        papers = get_papers(args.data, refs_files)
-    else:
+    for p in tqdm(dataset.iterdir(), desc="Initializing papers"):
+        papers[p.name] = read_paper(p)
+
+    aliases: dict[arXivId, arXivId] = {}
+    if signatures is not None:
+        aliases = deduplicate(papers, dict(bibs), signatures, stage=stage)
+    simple_titles: list[tuple[arXivId, str]] = [(id, simplify(paper.title))
+                                                for id, paper in papers.items()]
+    match_citations([(id, bib, simple_titles) for id, bib in bibs if id in papers],
+                    papers, stage)
+    if stage is not None:
+        stage.count("papers", len(papers))
+    return papers, aliases
+
+
+def fingerprint(dir: Path) -> str:
+    """Identify the contents of a paper directory by the names, sizes and mtimes of its files.
+
+    `BIB_FILE` is ignored since it is generated from the other files.
+    """
+    h = hashlib.sha256()
+    for file in sorted(dir.iterdir()):
+        if file.name != BIB_FILE:
+            stat = file.stat()
+            h.update(f"{file.name}:{stat.st_size}:{stat.st_mtime_ns}\0".encode())
+    return h.hexdigest()
+
+
+def get_manifest(dataset: Path) -> dict[arXivId, str]:
+    """Fingerprints of all paper directories."""
+    return {dir.name: fingerprint(dir) for dir in dataset.iterdir() if dir.is_dir()}
+
+
+def update_papers(
+    dataset: Path,
+    papers: dict[arXivId, Paper],
+    old_manifest: Optional[dict[arXivId, str]],
+    manifest: dict[arXivId, str],
+    aliases: dict[arXivId, arXivId],
+    stage: Optional[Stage] = None,
+    signatures: Optional[dict[arXivId, np.ndarray]] = None
+) -> dict[arXivId, Optional[Paper]]:
+    """Bring `papers` up to date with `dataset` and return the patch that does so.
+
+    New bibliographies are matched against all titles, and the existing ones
+    only against the new titles. Changed papers are treated as removed and
+    added again. Without an old manifest, the papers in `papers` are assumed to
+    be unchanged.
+
+    With `signatures`, new papers that are near-duplicates of other papers are
+    added to `aliases` instead of `papers`; existing papers are never removed
+    as duplicates. Duplicates whose kept paper was removed are processed again.
+
+    The patch maps each added or modified paper to its new value and each
+    removed paper to `None`.
+    """
+    if old_manifest is None:
+        old_manifest = {id: manifest[id] for id in papers if id in manifest}
+    removed: set[arXivId] = {id for id in papers
+                             if id not in manifest or old_manifest.get(id) != manifest[id]}
+    for alias, kept in list(aliases.items()):
+        if alias not in manifest or kept in removed:
+            del aliases[alias]
+    new: list[arXivId] = sorted(id for id in manifest
+                                if (id not in papers or id in removed) and id not in aliases)
+    logger.info(f"{len(new)} new or changed papers, "
+                f"{len(removed - set(new))} removed papers")
+
+    patch: dict[arXivId, Optional[Paper]] = {}
+    for id in removed:
+        del papers[id]
+        patch[id] = None
+        if signatures is not None:
+            signatures.pop(id, None)
+    for id, paper in papers.items():
+        if paper.references & removed:
+            paper.references -= removed
+            patch[id] = paper
+    if not new:
+        return patch
+
+    for id in new:
+        # regenerate the simplified bibliography in case the bib files changed
+        (dataset / id / BIB_FILE).unlink(missing_ok=True)
+        papers[id] = read_paper(dataset / id)
+    bibs: dict[arXivId, str] = dict(process_bibliographies(dataset, list(papers)))
+    if signatures is not None:
+        aliases.update(deduplicate(papers, bibs, signatures, set(new), stage))
+        new = [id for id in new if id not in aliases]
+    for id in new:
+        patch[id] = papers[id]
+
+    new_titles: list[tuple[arXivId, str]] = [(id, simplify(papers[id].title))
+                                             for id in new]
+    all_titles: list[tuple[arXivId, str]] = [(id, simplify(paper.title))
+                                             for id, paper in papers.items()]
+    new_set: set[arXivId] = set(new)
+    jobs = [(id, bibs[id], all_titles if id in new_set else new_titles) for id in papers]
+
+    for id in match_citations(jobs, papers, stage):
+        patch[id] = papers[id]
+    if stage is not None:
+        stage.count("papers", len(new))
+    return patch
+
+
+def run(args, metrics: Metrics):
+    papers: dict[arXivId, Paper] = {}
+    if not args.data.is_dir():
         print(f"error: {args.data} is not a directory", file=sys.stderr)
         exit(1)
 
-    if args.json:
-        save_dataset(papers, args.output, args.json)
+    with metrics.stage("clean"):
+        clean_dataset(args.data)
+    if args.clean:
+        return
+    manifest_path = sidecar_path(args.output, MANIFEST_SUFFIX)
+    aliases_path = sidecar_path(args.output, ALIASES_SUFFIX)
+    signatures_path = sidecar_path(args.output, SIGNATURES_SUFFIX)
+    aliases: dict[arXivId, arXivId] = {}
+    signatures: Optional[dict[arXivId, np.ndarray]] = {} if args.dedup else None
+    if not args.dedup:
+        # papers can change without their signatures being updated
+        signatures_path.unlink(missing_ok=True)
+    with metrics.stage("fingerprint") as stage:
+        manifest: dict[arXivId, str] = get_manifest(args.data)
+        stage.count("papers", len(manifest))
+
+    if args.incremental and args.output.exists():
+        with metrics.stage("load dataset") as stage:
+            papers = load_dataset(args.output)
+            old_manifest: Optional[dict[arXivId, str]] = None
+            if manifest_path.exists():
+                old_manifest = json.loads(manifest_path.read_text())
+            if aliases_path.exists():
+                aliases = json.loads(aliases_path.read_text())
+            if signatures is not None and signatures_path.exists():
+                signatures = load_signatures(signatures_path)
+            stage.count("papers", len(papers))
+        with metrics.stage("update papers") as stage:
+            patch = update_papers(args.data, papers, old_manifest, manifest, aliases, stage,
+                                  signatures)
+        with metrics.stage("save") as stage:
+            stage.count("papers", len(patch))
+            if patch:
+                append_dataset(patch, args.output, args.json)
     else:
-        save_dataset(papers, args.output)
+        with metrics.stage("process bibliographies") as stage:
+            refs_files: list[tuple[arXivId, str]] = process_bibliographies(args.data)
+            stage.count("bibliographies", len(refs_files))
+        if args.preprocess:
+            return
+        with metrics.stage("get papers") as stage:
+            papers, aliases = get_papers(args.data, refs_files, stage, signatures)
+        with metrics.stage("save") as stage:
+            stage.count("papers", len(papers))
+            if args.json:
+                save_dataset(papers, args.output, args.json)
+            else:
+                save_dataset(papers, args.output)
+
+    manifest_path.write_text(json.dumps(manifest))
+    # written by scripts/create_dataset_semantic_scholar.py for a paperId-keyed dataset
+    IdIndex.path_for(args.output).unlink(missing_ok=True)
+    aliases_path.write_text(json.dumps(aliases, indent=4))
+    if signatures is not None:
+        save_signatures(signatures, signatures_path)
+
+
+def main():
+    args = parse_args()
+    setup_logger(args.log)
+
+    metrics = Metrics()
+    run(args, metrics)
+    if args.metrics:
+        metrics.write(args.metrics)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# the scripts are not a package; make `import preprocess_dataset` etc. work
+sys.path.insert(0, str(Path(__file__).parent.parent / "scripts"))
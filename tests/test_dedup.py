@@ -0,0 +1,38 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from cglp.data.dedup import (compute_signatures, find_duplicates, load_signatures,
+                             save_signatures, shingles, simplify)
+
+ABSTRACT: str = simplify(
+    "We propose a method for predicting the citations of a new paper from its title and "
+    "abstract, using document embeddings and the citation graph of the existing papers."
+)
+
+
+def test_find_duplicates():
+    words = ABSTRACT.split()
+    words[len(words) // 2] = "duplicate"
+    texts = {"a": ABSTRACT, "b": " ".join(words), "c": simplify("An unrelated paper on "
+                                                                 "compilers and type systems.")}
+    assert find_duplicates(compute_signatures(texts)) == [["a", "b"]]
+
+
+def test_short_texts():
+    # texts without shingles must not all end up in one cluster
+    texts = {"a": "", "b": "two words", "c": "two words", "d": ABSTRACT}
+    assert len(shingles("two words")) == 0
+    signatures = compute_signatures(texts)
+    assert list(signatures) == ["d"]
+    assert find_duplicates(signatures) == []
+
+
+def test_save_signatures(tmp_path):
+    signatures = compute_signatures({"a": ABSTRACT, "b": "a b c d"})
+    save_signatures(signatures, tmp_path / "signatures.npz")
+    loaded = load_signatures(tmp_path / "signatures.npz")
+    assert loaded.keys() == signatures.keys()
+    assert all((loaded[key] == signatures[key]).all() for key in signatures)
+    save_signatures({}, tmp_path / "empty.npz")
+    assert load_signatures(tmp_path / "empty.npz") == {}
@@ -0,0 +1,70 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from cglp.data import IdIndex, Paper, index_references, load_citation_graph, save_dataset
+
+
+def paper(*references: str) -> Paper:
+    return Paper("Title", "Abstract", set(references))
+
+
+def test_ingested_precedence():
+    ids = IdIndex()
+    ids.add("2101.00001", "p1")
+    # a reference with a stale or wrong mapping does not remap an ingested paper
+    ids.add("2101.00001", "p9", ingested=False)
+    ids.add("2102.00002", "p1", ingested=False)
+    assert ids.arxiv_to_paper == {"2101.00001": "p1", "2102.00002": "p1"}
+    assert ids.paper_to_arxiv == {"p1": "2101.00001", "p9": "2101.00001"}
+
+    # an ingested paper replaces a mapping taken from a reference
+    ids.add("2102.00002", "p2")
+    assert ids.arxiv_to_paper["2102.00002"] == "p2"
+    assert ids.paper_to_arxiv["p2"] == "2102.00002"
+
+
+def test_save_load(tmp_path):
+    ids = IdIndex()
+    ids.add("2101.00001", "p1")
+    ids.add("2101.00001", "p9", ingested=False)
+    ids.save(tmp_path / "ids.json")
+    assert IdIndex.load(tmp_path / "ids.json") == ids
+
+
+def test_index_references():
+    papers = {"p1": paper(), "p2": paper("p1", "2101.00001"), "p3": paper("2102.00002", "p4")}
+    ids = IdIndex()
+    ids.add("2101.00001", "p1")
+    ids.add("2102.00002", "p2")
+    citations = index_references(papers, ids)
+    assert citations.nodes == ["p1", "p2", "p3"]
+    assert citations.edges.tolist() == [[1, 0], [2, 1]]
+    assert citations.unresolved == 1
+
+    citations = index_references(papers)
+    assert citations.edges.tolist() == [[1, 0]]
+    assert citations.unresolved == 3
+
+
+def test_index_references_reverse():
+    # a dataset keyed by arXiv IDs with references given as paperIds; the
+    # mapping is only known from the reverse direction
+    papers = {"2101.00001": paper(), "2102.00002": paper("p1")}
+    ids = IdIndex(paper_to_arxiv={"p1": "2101.00001"})
+    assert index_references(papers, ids).edges.tolist() == [[1, 0]]
+    assert index_references({}, ids).edges.shape == (0, 2)
+
+
+def test_load_citation_graph(tmp_path):
+    papers = {"p1": paper(), "p2": paper("2101.00001")}
+    save_dataset(papers, tmp_path / "dataset")
+    assert load_citation_graph(tmp_path / "dataset")[1].unresolved == 1
+
+    ids = IdIndex()
+    ids.add("2101.00001", "p1")
+    ids.save(IdIndex.path_for(tmp_path / "dataset"))
+    loaded, citations = load_citation_graph(tmp_path / "dataset")
+    assert loaded == papers
+    assert citations.edges.tolist() == [[1, 0]]
+    assert citations.unresolved == 0
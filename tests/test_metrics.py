@@ -0,0 +1,72 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from cglp.metrics import Metrics, Stage, tree_rss
+
+
+def test_stage_accumulates():
+    metrics = Metrics()
+    with metrics.stage("a") as stage:
+        stage.count("papers", 2)
+    with metrics.stage("b") as stage:
+        stage.count("papers")
+    with metrics.stage("a") as stage:
+        stage.count("papers", 3)
+        stage.count("tokens", 10)
+    # stages are recorded in the order they (last) finished
+    assert list(metrics.stages) == ["b", "a"]
+    assert metrics.stages["a"].counters == {"papers": 5, "tokens": 10}
+    assert metrics.stages["a"].peak_rss > 0
+
+
+def test_stage_records_on_error():
+    metrics = Metrics()
+    with pytest.raises(ValueError):
+        with metrics.stage("a"):
+            raise ValueError
+    assert metrics.stages["a"].seconds > 0
+
+
+def test_rates():
+    stage = Stage(seconds=2.0, counters={"papers": 10, "tokens": 1000})
+    assert stage.rates() == {"papers/sec": 5.0, "tokens/sec": 500.0}
+    assert Stage(counters={"papers": 10}).rates() == {}
+
+
+def test_write(tmp_path):
+    metrics = Metrics()
+    with metrics.stage("load") as stage:
+        stage.count("papers", 4)
+    metrics.write(tmp_path / "out" / "metrics.json")
+    data = json.loads((tmp_path / "out" / "metrics.json").read_text())
+    assert data.keys() == {"total_seconds", "peak_rss", "stages"}
+    assert data["peak_rss"] == metrics.stages["load"].peak_rss
+    assert data["stages"]["load"].keys() == {"seconds", "peak_rss", "counters", "rates"}
+    assert data["stages"]["load"]["counters"] == {"papers": 4}
+    assert data["stages"]["load"]["rates"].keys() == {"papers/sec"}
+
+
+def test_report():
+    metrics = Metrics()
+    with metrics.stage("load") as stage:
+        stage.count("papers", 4)
+    out = io.StringIO()
+    metrics.report(out)
+    lines = out.getvalue().splitlines()
+    assert [line.split()[0] for line in lines] == ["load", "total"]
+    assert "papers/sec" in lines[0]
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/statm"), reason="needs /proc")
+def test_peak_rss_includes_children():
+    size = 256 << 20
+    metrics = Metrics()
+    with metrics.stage("child"):
+        subprocess.run([sys.executable, "-c",
+                        f"import time; x = bytearray({size}); time.sleep(0.5)"], check=True)
+    assert metrics.stages["child"].peak_rss >= tree_rss() + size // 2
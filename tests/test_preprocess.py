@@ -0,0 +1,153 @@
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("bibtexparser")
+pytest.importorskip("rapidfuzz")
+pytest.importorskip("tqdm")
+
+import preprocess_dataset
+from preprocess_dataset import (get_manifest, get_papers, process_bibliographies, run,
+                                update_papers)
+
+TITLES: dict[str, str] = {
+    "2101.00001": "Graph Neural Networks for Citation Prediction",
+    "2102.00002": "Contrastive Pretraining of Scientific Document Encoders",
+    "2103.00003": "Link Prediction with Subgraph Sampling at Scale",
+    "2104.00004": "A Survey of Retrieval Methods for Scholarly Literature",
+}
+
+
+def write_paper(dataset: Path, id: str, cites: list[str], title: str = ""):
+    """Write a paper directory like the ones in the assignment dataset."""
+    dir = dataset / id
+    dir.mkdir(parents=True, exist_ok=True)
+    (dir / "title.txt").write_text(title or TITLES[id])
+    (dir / "abstract.txt").write_text(f"We study {(title or TITLES[id]).lower()} in depth.")
+    (dir / "refs.bib").write_text("".join(
+        f"@article{{ref{i},\n  title = {{{TITLES[cited]}}},\n}}\n"
+        for i, cited in enumerate(cites)
+    ))
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """A dataset that is processed once and then changed before the incremental run."""
+    dataset = tmp_path / "dataset"
+    write_paper(dataset, "2101.00001", [])
+    write_paper(dataset, "2102.00002", ["2101.00001", "2104.00004"])
+    write_paper(dataset, "2103.00003", ["2101.00001", "2102.00002"])
+    papers, aliases = get_papers(dataset, process_bibliographies(dataset))
+    return dataset, papers, get_manifest(dataset), aliases
+
+
+def full_run(dataset: Path):
+    papers, _ = get_papers(dataset, process_bibliographies(dataset))
+    return papers
+
+
+def incremental_run(dataset: Path, papers, old_manifest, aliases):
+    return update_papers(dataset, papers, old_manifest, get_manifest(dataset), aliases)
+
+
+def test_unchanged(dataset):
+    dataset, papers, manifest, aliases = dataset
+    before = {id: paper.references.copy() for id, paper in papers.items()}
+    assert incremental_run(dataset, papers, manifest, aliases) == {}
+    assert {id: paper.references for id, paper in papers.items()} == before
+
+
+def test_added(dataset):
+    dataset, papers, manifest, aliases = dataset
+    # the new paper cites an old one, and an old bibliography cites the new paper
+    write_paper(dataset, "2104.00004", ["2103.00003"])
+    patch = incremental_run(dataset, papers, manifest, aliases)
+    assert set(patch) == {"2104.00004", "2102.00002"}
+    assert patch["2104.00004"].references == {"2103.00003"}
+    assert papers == full_run(dataset)
+
+
+def test_removed(dataset):
+    dataset, papers, manifest, aliases = dataset
+    for file in (dataset / "2101.00001").iterdir():
+        file.unlink()
+    (dataset / "2101.00001").rmdir()
+    patch = incremental_run(dataset, papers, manifest, aliases)
+    # the papers citing the removed paper lose the reference
+    assert set(patch) == {"2101.00001", "2102.00002", "2103.00003"}
+    assert patch["2101.00001"] is None
+    assert papers == full_run(dataset)
+
+
+def test_changed(dataset):
+    dataset, papers, manifest, aliases = dataset
+    write_paper(dataset, "2103.00003", ["2102.00002"], title="Subgraph Sampling Revisited")
+    patch = incremental_run(dataset, papers, manifest, aliases)
+    assert set(patch) == {"2103.00003"}
+    assert patch["2103.00003"].title == "Subgraph Sampling Revisited"
+    assert patch["2103.00003"].references == {"2102.00002"}
+    assert papers == full_run(dataset)
+
+
+def test_without_manifest(dataset):
+    dataset, papers, _, aliases = dataset
+    write_paper(dataset, "2104.00004", [])
+    patch = incremental_run(dataset, papers, None, aliases)
+    assert set(patch) == {"2104.00004", "2102.00002"}
+    assert papers == full_run(dataset)
+
+
+def test_duplicate(dataset, monkeypatch):
+    dataset, papers, manifest, aliases = dataset
+    signatures = {}
+    papers, aliases = get_papers(dataset, process_bibliographies(dataset), signatures=signatures)
+    assert aliases == {} and signatures.keys() == papers.keys()
+
+    # a cross-listed copy of an existing paper, and a paper too short to have shingles
+    write_paper(dataset, "2104.00004", ["2101.00001"], title=TITLES["2102.00002"])
+    write_paper(dataset, "2104.00005", [], title="Short")
+    (dataset / "2104.00005" / "abstract.txt").write_text("")
+    hashed = []
+    compute_signatures = preprocess_dataset.compute_signatures
+    monkeypatch.setattr(preprocess_dataset, "compute_signatures",
+                        lambda texts: hashed.extend(texts) or compute_signatures(texts))
+    patch = update_papers(dataset, papers, manifest, get_manifest(dataset), aliases,
+                          signatures=signatures)
+    assert sorted(hashed) == ["2104.00004", "2104.00005"]
+    assert aliases == {"2104.00004": "2102.00002"}
+    assert set(patch) == {"2104.00005"}
+    assert "2104.00004" not in signatures and "2104.00005" not in signatures
+
+
+def test_sidecars(dataset, tmp_path):
+    from cglp.data import load_dataset
+    from cglp.metrics import Metrics
+
+    dataset = dataset[0]
+    output = tmp_path / "out" / "dataset"
+    signatures = output.with_name("dataset.signatures.npz")
+
+    def run_script(incremental: bool, dedup: bool):
+        run(Namespace(data=dataset, output=output, clean=False, preprocess=False, json=None,
+                      incremental=incremental, dedup=dedup), Metrics())
+
+    # an ID index left behind by scripts/create_dataset_semantic_scholar.py
+    ids = output.with_name("dataset.ids.json")
+    ids.parent.mkdir(parents=True)
+    ids.write_text("{}")
+    run_script(incremental=False, dedup=True)
+    assert signatures.exists()
+    assert not ids.exists()
+
+    # a paper changes in a run without --dedup, which must not leave its old signature
+    write_paper(dataset, "2103.00003", ["2102.00002"], title="Subgraph Sampling Revisited")
+    run_script(incremental=True, dedup=False)
+    assert not signatures.exists()
+
+    # with the old signature of 2103.00003, the new paper would be removed as its duplicate
+    write_paper(dataset, "2104.00004", [], title=TITLES["2103.00003"])
+    run_script(incremental=True, dedup=True)
+    assert load_dataset(output).keys() == {"2101.00001", "2102.00002", "2103.00003",
+                                           "2104.00004"}
+    assert signatures.exists()
@@ -0,0 +1,133 @@
+import threading
+import zlib
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("adapters")
+
+import numpy as np
+import torch
+
+from cglp.model import TokenizedCorpus, prefetch_batches, tokens
+
+VOCAB_SIZE: int = 1000
+TEXTS: list[str] = [" ".join(f"w{i * j % 97}" for j in range(i % 13 + 1)) for i in range(50)]
+
+
+class StubTokenizer:
+    """Stands in for the SPECTER2 tokenizer (hashes words into the vocabulary)."""
+    pad_token_id = 0
+
+    def __init__(self):
+        self.calls: int = 0
+
+    def __len__(self) -> int:
+        return VOCAB_SIZE
+
+    def get_vocab(self) -> dict[str, int]:
+        return {f"t{i}": i for i in range(VOCAB_SIZE)}
+
+    def __call__(self, texts, truncation=False, max_length=None, padding=False,
+                 return_tensors=None, return_token_type_ids=None, return_attention_mask=True):
+        self.calls += 1
+        ids = [[101] + [zlib.crc32(w.encode()) % 800 + 200 for w in text.split()] + [102]
+               for text in texts]
+        if truncation:
+            ids = [x[:max_length] for x in ids]
+        if not padding:
+            return {"input_ids": ids}
+        width = max(len(x) for x in ids)
+        return {
+            "input_ids": torch.tensor([x + [self.pad_token_id] * (width - len(x)) for x in ids]),
+            "attention_mask": torch.tensor([[1] * len(x) + [0] * (width - len(x)) for x in ids]),
+        }
+
+
+def test_batch_matches_tokenizer(tmp_path, monkeypatch):
+    monkeypatch.setattr(tokens, "CHUNK_SIZE", 7)
+    tokenizer = StubTokenizer()
+    corpus = TokenizedCorpus.build(TEXTS, tokenizer, tmp_path / "tokens", max_length=8)
+    assert len(corpus) == len(TEXTS)
+    for start in range(0, len(TEXTS), 16):
+        expected = tokenizer(TEXTS[start : start + 16], truncation=True, max_length=8,
+                             padding=True)
+        batch = corpus.batch(start, start + 16, tokenizer.pad_token_id)
+        assert batch.keys() == expected.keys()
+        for key in batch:
+            assert torch.equal(batch[key], expected[key])
+
+
+def test_cache(tmp_path):
+    tokenizer = StubTokenizer()
+    TokenizedCorpus.build(TEXTS, tokenizer, tmp_path / "tokens")
+    calls = tokenizer.calls
+    TokenizedCorpus.build(TEXTS, tokenizer, tmp_path / "tokens")
+    assert tokenizer.calls == calls
+
+    # a different corpus or truncation rebuilds the cache in place
+    corpus = TokenizedCorpus.build(TEXTS[:10], tokenizer, tmp_path / "tokens")
+    assert tokenizer.calls > calls and len(corpus) == 10
+    calls = tokenizer.calls
+    TokenizedCorpus.build(TEXTS[:10], tokenizer, tmp_path / "tokens", max_length=4)
+    assert tokenizer.calls > calls
+    assert [p.name for p in tmp_path.iterdir()] == ["tokens"]
+
+
+def test_interrupted_build(tmp_path, monkeypatch):
+    tokenizer = StubTokenizer()
+    TokenizedCorpus.build(TEXTS, tokenizer, tmp_path / "tokens")
+    # a temporary directory left behind by a killed run does not get in the way
+    (tmp_path / ".tokens.tmp-stale").mkdir()
+
+    def fail(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    with monkeypatch.context() as m:
+        m.setattr(np, "save", fail)
+        with pytest.raises(KeyboardInterrupt):
+            TokenizedCorpus.build(TEXTS[:10], tokenizer, tmp_path / "tokens")
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".tokens.tmp-stale", "tokens"]
+
+    # the old cache is intact and still a hit
+    calls = tokenizer.calls
+    assert len(TokenizedCorpus.build(TEXTS, tokenizer, tmp_path / "tokens")) == len(TEXTS)
+    assert tokenizer.calls == calls
+
+
+def test_prefetch_batches(tmp_path):
+    corpus = TokenizedCorpus.build(TEXTS, StubTokenizer(), tmp_path / "tokens")
+    batches = list(prefetch_batches(corpus, 16, 0, prefetch=2))
+    assert len(batches) == 4
+    for i, batch in enumerate(batches):
+        expected = corpus.batch(i * 16, i * 16 + 16, 0)
+        assert all(torch.equal(batch[key], expected[key]) for key in expected)
+
+
+def test_prefetch_batches_error(tmp_path, monkeypatch):
+    corpus = TokenizedCorpus.build(TEXTS, StubTokenizer(), tmp_path / "tokens")
+    batch = corpus.batch
+
+    def fail_at_second_batch(start, stop, pad_token_id):
+        if start > 0:
+            raise ValueError("bad batch")
+        return batch(start, stop, pad_token_id)
+
+    monkeypatch.setattr(corpus, "batch", fail_at_second_batch)
+    threads = threading.active_count()
+    with pytest.raises(ValueError, match="bad batch"):
+        for _ in prefetch_batches(corpus, 4, 0, prefetch=1):
+            pass
+    assert threading.active_count() == threads
+
+
+def test_prefetch_batches_stop(tmp_path):
+    corpus = TokenizedCorpus.build(TEXTS, StubTokenizer(), tmp_path / "tokens")
+    threads = threading.active_count()
+    batches = prefetch_batches(corpus, 1, 0, prefetch=1)
+    next(batches)
+    # closing the generator early stops the producer, which is blocked on a full queue
+    batches.close()
+    assert threading.active_count() == threads
@@ -0,0 +1,47 @@
+import gzip
+import json
+
+from cglp.data import Paper, append_dataset, load_dataset, save_dataset
+
+
+def paper(title: str, *references: str) -> Paper:
+    return Paper(title, f"The abstract of {title}.", set(references))
+
+
+def test_append_dataset(tmp_path):
+    papers = {"a": paper("A"), "b": paper("B", "a"), "c": paper("C", "a", "b")}
+    save_dataset(papers, tmp_path / "dataset")
+
+    append_dataset({"b": paper("B2"), "c": None, "d": paper("D", "b")}, tmp_path / "dataset")
+    assert load_dataset(tmp_path / "dataset") == {
+        "a": paper("A"), "b": paper("B2"), "d": paper("D", "b")
+    }
+
+
+def test_append_dataset_in_order(tmp_path):
+    save_dataset({"a": paper("A")}, tmp_path / "dataset")
+    append_dataset({"a": None}, tmp_path / "dataset")
+    append_dataset({"a": paper("A2")}, tmp_path / "dataset")
+    append_dataset({"b": paper("B")}, tmp_path / "dataset")
+    append_dataset({"b": None}, tmp_path / "dataset")
+    assert load_dataset(tmp_path / "dataset") == {"a": paper("A2")}
+
+
+def test_append_dataset_json(tmp_path):
+    save_dataset({"a": paper("A"), "b": paper("B")}, tmp_path / "dataset")
+    append_dataset({"a": None, "c": paper("C", "b")}, tmp_path / "dataset",
+                   tmp_path / "dataset.json")
+    data = json.loads((tmp_path / "dataset.json").read_text())
+    assert {id: Paper.from_dict(p) for id, p in data.items()} == {
+        "b": paper("B"), "c": paper("C", "b")
+    }
+
+
+def test_save_dataset_compacts(tmp_path):
+    save_dataset({"a": paper("A")}, tmp_path / "dataset")
+    append_dataset({"a": None, "b": paper("B")}, tmp_path / "dataset")
+    save_dataset(load_dataset(tmp_path / "dataset"), tmp_path / "dataset")
+    with gzip.open(tmp_path / "dataset", 'rt') as f:
+        assert json.load(f) == {
+            "b": {"title": "B", "abstract": "The abstract of B.", "references": []}
+        }